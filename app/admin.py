@@ -0,0 +1,27 @@
+"""
+Admin endpoint protection
+Admin/diagnostic endpoints require the X-Admin-Key header to match
+ADMIN_API_KEY. They are disabled entirely when no key is configured.
+"""
+import secrets
+from typing import Annotated, Optional
+
+from fastapi import Header, HTTPException, status
+
+from app.config import config
+from app.logger import logger
+
+
+async def require_admin(x_admin_key: Annotated[Optional[str], Header()] = None):
+    """FastAPI dependency guarding admin endpoints"""
+    if not config.ADMIN_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not Found"
+        )
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, config.ADMIN_API_KEY):
+        logger.warning("[admin] Rejected admin request with missing or invalid key")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin key"
+        )
@@ -0,0 +1,285 @@
+"""
+Credential Verification Module
+Checks username/password pairs against the stored bcrypt hashes. bcrypt runs
+in worker threads behind a bounded semaphore so it can't stall the event
+loop, and attempts are throttled per username and per client IP before any
+hashing happens. No database connection is held while hashing.
+"""
+import asyncio
+import re
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Deque, Optional
+
+import bcrypt
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import config
+from app.logger import logger
+from app.models import User
+
+
+class AuthThrottledError(Exception):
+    """Raised when a username or client IP has too many recent failed attempts"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Too many failed attempts, retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class AuthBusyError(Exception):
+    """Raised when the bcrypt queue is full"""
+
+
+class FailedAttemptThrottle:
+    """
+    Sliding-window count of failed attempts per key. An attempt is recorded
+    before its password is checked and discarded if it succeeds, so attempts
+    still in flight count against the limit too. At most max_keys keys are
+    tracked; past that the least recently attempted key is evicted.
+    """
+
+    def __init__(self, window_seconds: float, max_keys: int = 100000):
+        """
+        Initialize failed attempt throttle
+
+        Args:
+            window_seconds: How long a failed attempt counts against its key
+            max_keys: Maximum number of tracked keys
+        """
+        self.window = window_seconds
+        self.max_keys = max_keys
+        self._attempts: OrderedDict[str, Deque[float]] = OrderedDict()
+
+    def _prune(self, key: str, now: float) -> Optional[Deque[float]]:
+        attempts = self._attempts.get(key)
+        if attempts is None:
+            return None
+        while attempts and attempts[0] <= now - self.window:
+            attempts.popleft()
+        if not attempts:
+            del self._attempts[key]
+            return None
+        return attempts
+
+    def retry_after(self, key: str, limit: int) -> float:
+        """Seconds until key may try again, or 0 if it is under the limit"""
+        now = time.monotonic()
+        attempts = self._prune(key, now)
+        if attempts is None or len(attempts) < limit:
+            return 0.0
+        return attempts[-limit] + self.window - now
+
+    def record_attempt(self, key: str) -> float:
+        """Count an attempt against key; returns a stamp for discard_attempt"""
+        now = time.monotonic()
+        attempts = self._attempts.get(key)
+        if attempts is None:
+            if len(self._attempts) >= self.max_keys:
+                self._attempts.popitem(last=False)
+            attempts = self._attempts[key] = deque()
+        else:
+            self._attempts.move_to_end(key)
+        attempts.append(now)
+        return now
+
+    def discard_attempt(self, key: str, stamp: float):
+        """Uncount one attempt, e.g. because it turned out to be successful"""
+        attempts = self._attempts.get(key)
+        if attempts is None:
+            return
+        try:
+            attempts.remove(stamp)
+        except ValueError:
+            return
+        if not attempts:
+            del self._attempts[key]
+
+    def reset(self, key: str):
+        self._attempts.pop(key, None)
+
+
+# Global throttle instance; usernames and IPs share it under prefixed keys
+failed_attempts = FailedAttemptThrottle(window_seconds=config.AUTH_FAILED_ATTEMPT_WINDOW_SECONDS)
+
+_bcrypt_slots = asyncio.Semaphore(config.BCRYPT_MAX_CONCURRENCY)
+_bcrypt_pending = 0
+_BCRYPT_COST = re.compile(r"^\$2[abxy]?\$(\d{2})\$")
+_dummy_hash: Optional[bytes] = None
+
+
+async def _run_bcrypt(func, *args):
+    """
+    Run a bcrypt call in a worker thread, at most BCRYPT_MAX_CONCURRENCY at a
+    time with up to BCRYPT_MAX_QUEUE more waiting
+
+    Raises:
+        AuthBusyError: If the queue is already full
+    """
+    global _bcrypt_pending
+    if _bcrypt_pending >= config.BCRYPT_MAX_CONCURRENCY + config.BCRYPT_MAX_QUEUE:
+        raise AuthBusyError("Password verification is at capacity")
+    _bcrypt_pending += 1
+    try:
+        async with _bcrypt_slots:
+            return await asyncio.to_thread(func, *args)
+    finally:
+        _bcrypt_pending -= 1
+
+
+def _checkpw(password: bytes, hashed: bytes) -> bool:
+    try:
+        return bcrypt.checkpw(password, hashed)
+    except ValueError:
+        # Malformed stored hash, or a password bcrypt refuses (over 72 bytes)
+        return False
+
+
+def _hash_cost(hashed: str) -> Optional[int]:
+    match = _BCRYPT_COST.match(hashed)
+    return int(match.group(1)) if match else None
+
+
+async def _burn_dummy_check(password: bytes):
+    """Spend the same bcrypt time for unknown users so timing doesn't reveal which usernames exist"""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = await _run_bcrypt(bcrypt.hashpw, b"dummy-password", bcrypt.gensalt(rounds=config.BCRYPT_ROUNDS))
+    await _run_bcrypt(_checkpw, password, _dummy_hash)
+
+
+async def verify_credentials(db_session: AsyncSession, username: str, password: str, client_ip: str) -> uuid.UUID | None:
+    """
+    Verify a username/password pair
+
+    Returns:
+        The matching active user's id, or None if the credentials are wrong
+
+    Raises:
+        AuthThrottledError: If the username or client IP is over its failed-attempt limit
+        AuthBusyError: If too many verifications are already queued for bcrypt
+    """
+    operation_id = str(uuid.uuid4())[:8]
+    start_time = time.time()
+    username_key = f"user:{username}"
+    ip_key = f"ip:{client_ip}"
+
+    # Throttle before touching the database or bcrypt
+    retry_after = max(
+        failed_attempts.retry_after(username_key, config.AUTH_MAX_FAILED_ATTEMPTS_PER_USERNAME),
+        failed_attempts.retry_after(ip_key, config.AUTH_MAX_FAILED_ATTEMPTS_PER_IP),
+    )
+    if retry_after > 0:
+        logger.warning(f"[auth.verify_credentials] Throttled", extra={
+            "operation_id": operation_id,
+            "operation": "verify_credentials",
+            "username": username,
+            "client_ip": client_ip,
+            "retry_after": round(retry_after, 1),
+            "status": "throttled"
+        })
+        raise AuthThrottledError(retry_after)
+
+    # Counted as failed until proven otherwise, so a parallel burst can't all
+    # slip past the check above while the first attempts are still hashing
+    username_stamp = failed_attempts.record_attempt(username_key)
+    ip_stamp = failed_attempts.record_attempt(ip_key)
+
+    # Release the connection before hashing; bcrypt may queue behind other logins
+    try:
+        async with db_session as session:
+            result = await session.execute(
+                select(User.user_id, User.password_hash)
+                .where(User.username == username, User.deleted_at.is_(None))
+            )
+            row = result.first()
+    except BaseException:
+        # Nothing was checked (database down, request cancelled); don't count it
+        failed_attempts.discard_attempt(username_key, username_stamp)
+        failed_attempts.discard_attempt(ip_key, ip_stamp)
+        raise
+    user_id, password_hash = row if row is not None else (None, None)
+
+    password_bytes = password.encode('utf-8')
+    try:
+        if not password_hash:
+            await _burn_dummy_check(password_bytes)
+            verified = False
+        else:
+            verified = await _run_bcrypt(_checkpw, password_bytes, password_hash.encode('utf-8'))
+    except AuthBusyError:
+        # Nothing was checked; don't hold the rejection against the caller
+        failed_attempts.discard_attempt(username_key, username_stamp)
+        failed_attempts.discard_attempt(ip_key, ip_stamp)
+        logger.warning(f"[auth.verify_credentials] bcrypt queue full", extra={
+            "operation_id": operation_id,
+            "operation": "verify_credentials",
+            "username": username,
+            "client_ip": client_ip,
+            "status": "busy"
+        })
+        raise
+
+    if not verified:
+        duration = time.time() - start_time
+        logger.warning(f"[auth.verify_credentials] Invalid credentials", extra={
+            "operation_id": operation_id,
+            "operation": "verify_credentials",
+            "username": username,
+            "client_ip": client_ip,
+            "duration_ms": round(duration * 1000, 2),
+            "status": "failed"
+        })
+        return None
+
+    failed_attempts.reset(username_key)
+    failed_attempts.discard_attempt(ip_key, ip_stamp)
+
+    # Upgrade hashes made with an outdated cost factor while we have the plaintext
+    cost = _hash_cost(password_hash)
+    if cost != config.BCRYPT_ROUNDS:
+        try:
+            new_hash = await _run_bcrypt(bcrypt.hashpw, password_bytes, bcrypt.gensalt(rounds=config.BCRYPT_ROUNDS))
+        except AuthBusyError:
+            new_hash = None  # Try again on a later login
+        if new_hash is not None:
+            # Short transaction of its own; the lookup's connection went back to the pool before hashing
+            try:
+                async with db_session as session:
+                    async with session.begin():
+                        await session.execute(
+                            update(User)
+                            .where(User.user_id == user_id, User.password_hash == password_hash)
+                            .values(password_hash=new_hash.decode('utf-8'), updated_at=datetime.now())
+                        )
+            except Exception as e:
+                # The password was verified; a failed upgrade shouldn't fail the login
+                logger.exception(f"[auth.verify_credentials] Rehash failed: {e}", extra={
+                    "operation_id": operation_id,
+                    "operation": "verify_credentials",
+                    "user_id": str(user_id),
+                    "error_type": "database_error",
+                    "error_details": str(e)
+                })
+            else:
+                logger.info(f"[auth.verify_credentials] Rehashed password", extra={
+                    "operation_id": operation_id,
+                    "operation": "verify_credentials",
+                    "user_id": str(user_id),
+                    "old_cost": cost,
+                    "new_cost": config.BCRYPT_ROUNDS
+                })
+
+    duration = time.time() - start_time
+    logger.info(f"[auth.verify_credentials] Credentials verified", extra={
+        "operation_id": operation_id,
+        "operation": "verify_credentials",
+        "user_id": str(user_id),
+        "username": username,
+        "duration_ms": round(duration * 1000, 2),
+        "status": "success"
+    })
+    return user_id
@@ -18,5 +18,25 @@ class Config(BaseSettings):
     ELASTICSEARCH_PORT: Optional[str] = None
     ELASTICSEARCH_INDEX: Optional[str] = None
     ELASTICSEARCH_LOG_LEVEL: Optional[str] = None
+    USER_BATCH_ENABLED: Optional[bool] = False
+    USER_BATCH_MAX_SIZE: Optional[int] = 100
+    USER_BATCH_LINGER_MS: Optional[float] = 5.0
+    USER_STATS_CACHE_TTL_SECONDS: Optional[float] = 30.0
+    EXPORT_SETTLE_SECONDS: Optional[float] = 300.0
+    SQL_ECHO: Optional[bool] = False
+    SQL_LOG_SAMPLE_RATE: Optional[float] = 0.0
+    SLOW_QUERY_THRESHOLD_MS: Optional[float] = 200.0
+    SLOW_QUERY_EXPLAIN: Optional[bool] = False
+    ADMIN_API_KEY: Optional[str] = None
+    BCRYPT_ROUNDS: Optional[int] = 12
+    BCRYPT_MAX_CONCURRENCY: Optional[int] = 4
+    BCRYPT_MAX_QUEUE: Optional[int] = 32
+    AUTH_FAILED_ATTEMPT_WINDOW_SECONDS: Optional[float] = 900.0
+    AUTH_MAX_FAILED_ATTEMPTS_PER_USERNAME: Optional[int] = 5
+    AUTH_MAX_FAILED_ATTEMPTS_PER_IP: Optional[int] = 20
+    LOOP_LAG_MONITOR_ENABLED: Optional[bool] = True
+    LOOP_LAG_THRESHOLD_MS: Optional[float] = 100.0
+    LOOP_LAG_CHECK_INTERVAL_MS: Optional[float] = 50.0
+    PROFILE_MAX_SECONDS: Optional[float] = 60.0
 
 config=Config()
\ No newline at end of file
@@ -3,6 +3,7 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
 )
 from app.config import config
+from app.query_stats import instrument_engine
 
 from sqlalchemy.orm import sessionmaker
 
@@ -11,9 +12,11 @@ SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
 
 def get_engine():
     try:
-        return create_async_engine(
-            SQLALCHEMY_DATABASE_URL, echo=True
+        engine = create_async_engine(
+            SQLALCHEMY_DATABASE_URL, echo=config.SQL_ECHO
         )
+        instrument_engine(engine)
+        return engine
     except Exception as e:
         print(e)
         return None
@@ -0,0 +1,222 @@
+"""
+Bulk User Export Module
+Streams the users table as CSV or Parquet in fixed-size chunks read from a
+server-side cursor, so a full extract never sits in memory at once.
+password_hash is never exported.
+
+created_at/updated_at are stamped by the app (datetime.now()) before the
+row commits, so a row can become visible after a later-stamped one has
+already been exported. To keep incremental runs from skipping such rows,
+every export stops at now() - EXPORT_SETTLE_SECONDS; anything newer is left
+for the next run. Transactions that take longer than the settle margin to
+commit can still be missed.
+"""
+import csv
+import io
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import func, select
+
+from app.config import config
+from app.database import AsyncSessionLocal
+from app.logger import logger
+from app.models import User
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is optional
+    pyarrow = None
+
+
+EXPORT_COLUMNS = [
+    User.user_id,
+    User.first_name,
+    User.last_name,
+    User.email,
+    User.username,
+    User.created_at,
+    User.updated_at,
+    User.deleted_at,
+]
+
+# updated_at is NULL until a row is first modified, so fall back to created_at
+WATERMARK_COLUMNS = {
+    "created_at": User.created_at,
+    "updated_at": func.coalesce(User.updated_at, User.created_at),
+}
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    return pyarrow is not None
+
+
+def to_naive_local(value: Optional[datetime]) -> Optional[datetime]:
+    """Convert an aware datetime to naive local time, which is how the timestamp columns are stored"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands back whatever the Parquet writer wrote since the last drain"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class UserExport:
+    """A single export run; tracks row count and the high watermark reached"""
+
+    def __init__(
+        self,
+        since: Optional[datetime] = None,
+        watermark: str = "created_at",
+        chunk_size: int = 1000,
+        session_factory=AsyncSessionLocal,
+    ):
+        """
+        Initialize user export
+
+        Args:
+            since: Only export rows whose watermark column is strictly after this,
+                in naive local time (aware values are converted); rows newer
+                than now() - EXPORT_SETTLE_SECONDS are always left out
+            watermark: Either "created_at" or "updated_at"
+            chunk_size: Rows fetched from the cursor and written per chunk
+            session_factory: Factory for the session the export reads with
+        """
+        if watermark not in WATERMARK_COLUMNS:
+            raise ValueError(f"Unsupported watermark column: {watermark}")
+        self.since = to_naive_local(since)
+        self.until: Optional[datetime] = None
+        self.watermark = watermark
+        self.chunk_size = max(1, chunk_size)
+        self.session_factory = session_factory
+        self.rows = 0
+        self.high_watermark: Optional[datetime] = None
+
+    def _query(self):
+        column = WATERMARK_COLUMNS[self.watermark]
+        query = select(*EXPORT_COLUMNS).order_by(column, User.user_id)
+        if self.since is not None:
+            query = query.where(column > self.since)
+        query = query.where(column <= self.until)
+        return query.execution_options(yield_per=self.chunk_size)
+
+    async def _chunks(self) -> AsyncIterator[list]:
+        export_id = str(uuid.uuid4())[:8]
+        start_time = time.time()
+        self.until = datetime.now() - timedelta(seconds=config.EXPORT_SETTLE_SECONDS)
+        try:
+            async with self.session_factory() as session:
+                result = await session.stream(self._query())
+                async for rows in result.partitions():
+                    self.rows += len(rows)
+                    last = rows[-1]
+                    if self.watermark == "updated_at":
+                        self.high_watermark = last.updated_at or last.created_at
+                    else:
+                        self.high_watermark = last.created_at
+                    yield rows
+        except Exception as e:
+            duration = time.time() - start_time
+            logger.exception(f"[export.users] Error: {e}", extra={
+                "export_id": export_id,
+                "operation": "export_users",
+                "error_type": "database_error",
+                "error_details": str(e),
+                "rows": self.rows,
+                "duration_ms": round(duration * 1000, 2),
+                "status": "failed"
+            })
+            raise
+
+        duration = time.time() - start_time
+        logger.info(f"[export.users] Exported {self.rows} users", extra={
+            "export_id": export_id,
+            "operation": "export_users",
+            "watermark": self.watermark,
+            "since": self.since.isoformat() if self.since else None,
+            "until": self.until.isoformat(),
+            "high_watermark": self.high_watermark.isoformat() if self.high_watermark else None,
+            "rows": self.rows,
+            "duration_ms": round(duration * 1000, 2),
+            "status": "success"
+        })
+
+    async def iter_csv(self) -> AsyncIterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([column.key for column in EXPORT_COLUMNS])
+        async for rows in self._chunks():
+            writer.writerows(rows)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+        # Header only, when nothing matched
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+    async def iter_parquet(self) -> AsyncIterator[bytes]:
+        if pyarrow is None:
+            raise RuntimeError("Parquet export requires pyarrow")
+        schema = pyarrow.schema([
+            ("user_id", pyarrow.string()),
+            ("first_name", pyarrow.string()),
+            ("last_name", pyarrow.string()),
+            ("email", pyarrow.string()),
+            ("username", pyarrow.string()),
+            ("created_at", pyarrow.timestamp("us")),
+            ("updated_at", pyarrow.timestamp("us")),
+            ("deleted_at", pyarrow.timestamp("us")),
+        ])
+        sink = _ChunkSink()
+        writer = pyarrow.parquet.ParquetWriter(sink, schema)
+        try:
+            async for rows in self._chunks():
+                columns = list(zip(*rows))
+                columns[0] = [str(user_id) for user_id in columns[0]]
+                # One row group per chunk
+                writer.write_table(pyarrow.Table.from_arrays(
+                    [pyarrow.array(values, type=field.type) for values, field in zip(columns, schema)],
+                    schema=schema
+                ))
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    def iter_format(self, export_format: str) -> AsyncIterator[bytes]:
+        if export_format == "csv":
+            return self.iter_csv()
+        if export_format == "parquet":
+            return self.iter_parquet()
+        raise ValueError(f"Unsupported export format: {export_format}")
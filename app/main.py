@@ -1,21 +1,31 @@
 from contextlib import asynccontextmanager
 from typing import Annotated
 
-from fastapi import Depends, FastAPI, HTTPException, status
-from fastapi.responses import RedirectResponse
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse, RedirectResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 from http import HTTPStatus
+from datetime import datetime
+from typing import Literal, Optional
 
-from app.models import Base, User, UserCreateModel
+from app.models import Base, LoginModel, User, UserCreateModel, UserStatsModel
 from app.database import get_db_session, get_engine
 from app.operations import (
     create_user,
     get_users,
-    get_user_by_id
+    get_user_by_id,
+    get_user_stats
 )
 
 from app.logger import logger
+from app.config import config
+from app.user_batcher import user_batcher, UserConflictError
+from app.export import EXPORT_FORMATS, UserExport, parquet_available
+from app.admin import require_admin
+from app.auth import AuthBusyError, AuthThrottledError, verify_credentials
+from app.profiling import loop_lag_monitor, sampling_profiler
+from app.query_stats import query_stats
 
 
 @asynccontextmanager
@@ -25,7 +35,16 @@ async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
         logger.info("[lifespan] Database connection established and tables created.")
-        yield
+        if config.USER_BATCH_ENABLED:
+            user_batcher.start()
+        if config.LOOP_LAG_MONITOR_ENABLED:
+            loop_lag_monitor.start()
+        try:
+            yield
+        finally:
+            await loop_lag_monitor.stop()
+            # Flush queued user inserts before the engine goes away
+            await user_batcher.stop()
     await engine.dispose()
     logger.info("[lifespan] Database connection disposed.")
 
@@ -47,7 +66,22 @@ async def add_user(user_data:UserCreateModel, db_session: Annotated[AsyncSession
     request_id = str(uuid.uuid4())[:8]
     
     try:
-        new_user:User = await create_user(db_session,user_data)
+        if user_batcher.running:
+            try:
+                new_user:User = await user_batcher.submit(user_data)
+            except UserConflictError:
+                logger.warning(f"User creation conflict", extra={
+                    "request_id": request_id,
+                    "endpoint": "POST /users/",
+                    "username": user_data.username,
+                    "error_type": "username_conflict"
+                })
+                raise HTTPException(
+                    status_code=HTTPStatus.CONFLICT,
+                    detail="Username already exists"
+                )
+        else:
+            new_user:User = await create_user(db_session,user_data)
         if new_user is None:
             logger.error(f"User creation failed", extra={
                 "request_id": request_id,
@@ -82,6 +116,42 @@ async def add_user(user_data:UserCreateModel, db_session: Annotated[AsyncSession
         )
     return new_user
 
+# user counts for dashboards; declared before /users/{user_id} so "stats" isn't taken as an id
+@app.get("/users/stats", status_code=status.HTTP_200_OK, response_model=UserStatsModel)
+async def read_user_stats(
+    db_session: Annotated[AsyncSession, Depends(get_db_session)],
+    days: Annotated[int, Query(ge=1, le=3650)] = 7,
+    approximate: bool = False,
+):
+    stats = await get_user_stats(db_session, days=days, approximate=approximate)
+    if stats is None:
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail="Internal Server Error"
+        )
+    return stats
+
+# full or incremental extract; also declared ahead of /users/{user_id}
+@app.get("/users/export", status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin)])
+async def export_users(
+    format: Literal["csv", "parquet"] = "csv",
+    since: Optional[datetime] = None,
+    watermark: Literal["created_at", "updated_at"] = "created_at",
+    chunk_size: Annotated[int, Query(ge=1, le=50000)] = 1000,
+):
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail="Parquet export requires pyarrow"
+        )
+    export = UserExport(since=since, watermark=watermark, chunk_size=chunk_size)
+    filename = f"users-{datetime.now().strftime('%Y%m%dT%H%M%S')}.{format}"
+    return StreamingResponse(
+        export.iter_format(format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 #get user by id
 @app.get("/users/{user_id}", status_code=status.HTTP_200_OK)
 async def read_user(user_id: str, db_session: Annotated[AsyncSession, Depends(get_db_session)]):
@@ -116,4 +186,67 @@ async def read_users(db_session: Annotated[AsyncSession, Depends(get_db_session)
         )
     return users
 
+@app.post("/auth/verify", status_code=status.HTTP_200_OK)
+async def verify_login(login: LoginModel, request: Request, db_session: Annotated[AsyncSession, Depends(get_db_session)]):
+    client_ip = request.client.host if request.client else "unknown"
+    try:
+        user_id = await verify_credentials(db_session, login.username, login.password, client_ip)
+    except AuthThrottledError as e:
+        raise HTTPException(
+            status_code=HTTPStatus.TOO_MANY_REQUESTS,
+            detail="Too many failed attempts - try again later",
+            headers={"Retry-After": str(max(1, int(e.retry_after + 0.5)))}
+        )
+    except AuthBusyError:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail="Too many login requests - try again shortly",
+            headers={"Retry-After": "1"}
+        )
+    except Exception as e:
+        logger.exception(f"Error: {e}",stack_info=True)
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail="Internal Server Error"
+        )
+    if user_id is None:
+        raise HTTPException(
+            status_code=HTTPStatus.UNAUTHORIZED,
+            detail="Invalid username or password"
+        )
+    return {"verified": True, "user_id": user_id}
+
+# per-fingerprint SQL timings collected by app.query_stats
+@app.get("/admin/query-stats", status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin)])
+async def read_query_stats(
+    limit: Annotated[int, Query(ge=1, le=1000)] = 50,
+    order_by: Literal["total_ms", "max_ms", "mean_ms", "count", "slow_count"] = "total_ms",
+):
+    return query_stats.snapshot(limit=limit, order_by=order_by)
+
+@app.delete("/admin/query-stats", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(require_admin)])
+async def reset_query_stats():
+    query_stats.reset()
 
+# recent event-loop stalls with the stack that was blocking the loop
+@app.get("/admin/loop-lag", status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin)])
+async def read_loop_lag():
+    return loop_lag_monitor.snapshot()
+
+# time-boxed sampling profile of this worker, as collapsed stacks for flamegraph.pl / speedscope
+@app.get("/admin/profile", status_code=status.HTTP_200_OK, response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def run_profile(
+    seconds: Annotated[float, Query(gt=0, le=config.PROFILE_MAX_SECONDS)] = 10.0,
+    interval_ms: Annotated[float, Query(ge=1, le=1000)] = 5.0,
+    all_threads: bool = False,
+):
+    if sampling_profiler.busy:
+        raise HTTPException(
+            status_code=HTTPStatus.CONFLICT,
+            detail="A profile is already running"
+        )
+    collapsed = await sampling_profiler.profile(seconds, interval_ms=interval_ms, all_threads=all_threads)
+    return PlainTextResponse(
+        collapsed,
+        headers={"Content-Disposition": f'attachment; filename="profile-{datetime.now().strftime("%Y%m%dT%H%M%S")}.collapsed"'}
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey, ForeignKeyConstraint, UniqueConstraint,Column, String, TIMESTAMP, ForeignKey, UUID
+from sqlalchemy import ForeignKey, ForeignKeyConstraint, UniqueConstraint,Column, Index, String, TIMESTAMP, ForeignKey, UUID
 from sqlalchemy.orm import (DeclarativeBase,Mapped,mapped_column,relationship)
 from pydantic import BaseModel, Field, EmailStr
 from sqlalchemy.ext.declarative import declarative_base  
@@ -18,6 +18,10 @@ class PydanticBaseModel(BaseModel):
 # Users Model  
 class User(Base):  
     __tablename__ = "users" 
+    __table_args__ = (
+        Index("idx_users_created_at", "created_at"),
+        Index("idx_users_username", "username"),
+    )
     user_id: Mapped[uuid.UUID] = mapped_column(pgUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     first_name: Mapped[str] = mapped_column(String(50), nullable=False)  
     last_name: Mapped[str] = mapped_column(String(50), nullable=False)  
@@ -32,3 +36,15 @@ class UserCreateModel(PydanticBaseModel):
     username: str
     password_hash: str
 
+class LoginModel(PydanticBaseModel):
+    username: str
+    password: str
+
+class UserStatsModel(PydanticBaseModel):
+    total: int
+    active: int
+    created_recent: int
+    days: int
+    approximate: bool
+    generated_at: datetime
+
@@ -1,6 +1,7 @@
 from sqlalchemy import (
     and_,
     delete,
+    func,
     select,
     text,
     update,
@@ -11,12 +12,40 @@ from sqlalchemy.orm import joinedload, load_only
 
 from app.models import (
     User,
-    UserCreateModel
+    UserCreateModel,
+    UserStatsModel
 )
 import bcrypt
+from datetime import datetime, timedelta
 
+from app.config import config
 from app.logger import logger
 
+# (days, approximate) -> (expires_at, UserStatsModel)
+_user_stats_cache: dict = {}
+
+def build_user(user_data: UserCreateModel) -> User:
+    """Build an unsaved User from the create payload, hashing the password."""
+    new_user = User()
+    new_user.first_name = user_data.first_name
+    new_user.last_name = user_data.last_name
+    
+    # ORGANIC ISSUE 4: Email validation bug
+    if user_data.email:  
+        new_user.email = user_data.email.strip()  # Could be None!
+    
+    new_user.username = user_data.username
+    
+    # ORGANIC ISSUE 5: Password hashing doesn't handle edge cases
+    if user_data.password_hash and len(user_data.password_hash) > 0:
+        salt = bcrypt.gensalt(rounds=config.BCRYPT_ROUNDS)
+        hashed_password = bcrypt.hashpw(user_data.password_hash.encode('utf-8'), salt)
+        new_user.password_hash = hashed_password.decode('utf-8')
+    else:
+        # This will create users with no password!
+        new_user.password_hash = ""  
+    return new_user
+
 async def create_user(db_session: AsyncSession, user_data: UserCreateModel) -> User:
     import time
     import uuid
@@ -45,24 +74,7 @@ async def create_user(db_session: AsyncSession, user_data: UserCreateModel) -> U
             })
             return None  # Sometimes return None, sometimes raise exception
             
-        new_user = User()
-        new_user.first_name = user_data.first_name
-        new_user.last_name = user_data.last_name
-        
-        # ORGANIC ISSUE 4: Email validation bug
-        if user_data.email:  
-            new_user.email = user_data.email.strip()  # Could be None!
-        
-        new_user.username = user_data.username
-        
-        # ORGANIC ISSUE 5: Password hashing doesn't handle edge cases
-        if user_data.password_hash and len(user_data.password_hash) > 0:
-            salt = bcrypt.gensalt()
-            hashed_password = bcrypt.hashpw(user_data.password_hash.encode('utf-8'), salt)
-            new_user.password_hash = hashed_password.decode('utf-8')
-        else:
-            # This will create users with no password!
-            new_user.password_hash = ""  
+        new_user = build_user(user_data)
             
         async with db_session.begin():
             db_session.add(new_user)
@@ -206,3 +218,96 @@ async def get_user_by_id(db_session: AsyncSession, user_id: str) -> list[User] |
         user = None
     return user
 
+async def _count_users_exact(session: AsyncSession, since: datetime) -> tuple[int, int, int]:
+    query = select(
+        func.count(),
+        func.count().filter(User.deleted_at.is_(None)),
+        func.count().filter(User.created_at >= since),
+    ).select_from(User)
+    result = await session.execute(query)
+    total, active, created_recent = result.one()
+    return total, active, created_recent
+
+async def _count_users_approximate(session: AsyncSession, since: datetime) -> tuple[int, int, int] | None:
+    # Planner estimates: row count from pg_class, soft-deleted share from the
+    # deleted_at null fraction. Both are only as fresh as the last ANALYZE.
+    result = await session.execute(text("""
+        SELECT c.reltuples,
+               (SELECT s.null_frac FROM pg_stats s
+                 WHERE s.schemaname = n.nspname
+                   AND s.tablename = c.relname
+                   AND s.attname = 'deleted_at')
+          FROM pg_class c
+          JOIN pg_namespace n ON n.oid = c.relnamespace
+         WHERE c.oid = to_regclass(:table_name)
+    """), {"table_name": User.__tablename__})
+    row = result.first()
+    # reltuples is -1 (or the table missing) until the table has been analyzed
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    total = int(row[0])
+    null_frac = row[1] if row[1] is not None else 1.0
+    active = int(round(total * null_frac))
+    # Recent signups are a range scan on idx_users_created_at, cheap enough to count exactly
+    result = await session.execute(
+        select(func.count()).select_from(User).where(User.created_at >= since)
+    )
+    created_recent = result.scalar_one()
+    return total, active, created_recent
+
+async def get_user_stats(db_session: AsyncSession, days: int = 7, approximate: bool = False) -> UserStatsModel | None:
+    import time
+    import uuid
+    
+    operation_id = str(uuid.uuid4())[:8]
+    start_time = time.time()
+    cache_key = (days, approximate)
+    
+    cached = _user_stats_cache.get(cache_key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    
+    try:
+        since = datetime.now() - timedelta(days=days)
+        async with db_session as session:
+            counts = None
+            if approximate:
+                counts = await _count_users_approximate(session, since)
+            if counts is None:
+                # Exact mode, or no planner statistics yet
+                counts = await _count_users_exact(session, since)
+                approximate = False
+        total, active, created_recent = counts
+        stats = UserStatsModel(
+            total=total,
+            active=active,
+            created_recent=created_recent,
+            days=days,
+            approximate=approximate,
+            generated_at=datetime.now()
+        )
+        _user_stats_cache[cache_key] = (time.monotonic() + config.USER_STATS_CACHE_TTL_SECONDS, stats)
+        
+        duration = time.time() - start_time
+        logger.info(f"[operations.get_user_stats] Computed user stats", extra={
+            "operation_id": operation_id,
+            "operation": "get_user_stats",
+            "approximate": approximate,
+            "days": days,
+            "user_count": total,
+            "duration_ms": round(duration * 1000, 2),
+            "status": "success"
+        })
+        
+    except Exception as e:
+        duration = time.time() - start_time
+        logger.exception(f"[operations.get_user_stats] Error: {e}", extra={
+            "operation_id": operation_id,
+            "operation": "get_user_stats",
+            "error_type": "database_error",
+            "error_details": str(e),
+            "duration_ms": round(duration * 1000, 2),
+            "status": "failed"
+        })
+        stats = None
+    return stats
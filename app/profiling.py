@@ -0,0 +1,185 @@
+"""
+Hot-Path Profiling Module
+An event-loop lag monitor that records stalls together with the stack of
+the code blocking the loop, and a sampling profiler that produces
+flamegraph-compatible collapsed stacks from a live worker.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.config import config
+from app.logger import logger
+
+
+class LoopLagMonitor:
+    """Detects event-loop stalls with a heartbeat task and a watchdog thread"""
+
+    def __init__(self, threshold_ms: float = 100.0, interval_ms: float = 50.0, max_events: int = 100):
+        """
+        Initialize loop lag monitor
+
+        Args:
+            threshold_ms: Lag above which a stall is recorded
+            interval_ms: Heartbeat period, and how often the watchdog checks it
+            max_events: Number of recent stalls kept
+        """
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.events: deque = deque(maxlen=max_events)
+        self.stall_count = 0
+        self.max_lag_ms = 0.0
+        self._heartbeat = 0.0
+        self._captured: Optional[tuple] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start monitoring the running event loop"""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._beat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info("[profiling] Loop lag monitor started", extra={
+            "threshold_ms": self.threshold * 1000,
+            "interval_ms": self.interval * 1000
+        })
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._watchdog.join(timeout=1)
+        self._task = None
+        self._watchdog = None
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            previous = self._heartbeat
+            self._heartbeat = now
+            lag = now - expected
+            if lag >= self.threshold:
+                self._record_stall(lag, previous)
+
+    def _watch(self):
+        # Runs in its own thread so it can look at the loop while the loop is stuck
+        while not self._stopped.wait(self.interval):
+            heartbeat = self._heartbeat
+            overdue = time.monotonic() - heartbeat - self.interval
+            if overdue < self.threshold:
+                continue
+            if self._captured is not None and self._captured[0] == heartbeat:
+                continue  # Already have a stack for this stall
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                self._captured = (heartbeat, traceback.format_stack(frame))
+
+    def _record_stall(self, lag: float, heartbeat: float):
+        stack = None
+        captured = self._captured
+        if captured is not None and captured[0] == heartbeat:
+            stack = [line.rstrip() for line in captured[1]]
+        lag_ms = round(lag * 1000, 2)
+        self.stall_count += 1
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        self.events.append({
+            "detected_at": datetime.now().isoformat(),
+            "lag_ms": lag_ms,
+            "stack": stack
+        })
+        logger.warning(f"[profiling] Event loop stalled for {lag_ms} ms", extra={
+            "lag_ms": lag_ms,
+            "threshold_ms": self.threshold * 1000,
+            "blocking_frame": stack[-1] if stack else None
+        })
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "threshold_ms": self.threshold * 1000,
+            "stall_count": self.stall_count,
+            "max_lag_ms": self.max_lag_ms,
+            "recent_stalls": list(self.events)
+        }
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float, thread_id: Optional[int] = None) -> str:
+    """
+    Sample thread stacks for a fixed time and return them in collapsed-stack format
+    ("root;caller;leaf count" per line), as consumed by flamegraph.pl and speedscope.
+    Samples every thread except the sampler's own unless thread_id is given.
+    """
+    own_thread = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    counts: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == own_thread or (thread_id is not None and ident != thread_id):
+                continue
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class SamplingProfiler:
+    """Runs one time-boxed sampling profile at a time, off the event loop"""
+
+    def __init__(self, max_seconds: float = 60.0):
+        self.max_seconds = max_seconds
+        self._lock = asyncio.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    async def profile(self, seconds: float, interval_ms: float = 5.0, all_threads: bool = False) -> str:
+        """Profile the event-loop thread (or every thread) and return collapsed stacks"""
+        seconds = min(seconds, self.max_seconds)
+        # Called on the loop, so this is the loop thread the samples are taken from
+        thread_id = None if all_threads else threading.get_ident()
+        async with self._lock:
+            logger.info("[profiling] Sampling profile started", extra={
+                "seconds": seconds,
+                "interval_ms": interval_ms,
+                "all_threads": all_threads
+            })
+            return await asyncio.to_thread(sample_stacks, seconds, interval_ms / 1000, thread_id)
+
+
+# Global profiling instances
+loop_lag_monitor = LoopLagMonitor(
+    threshold_ms=config.LOOP_LAG_THRESHOLD_MS,
+    interval_ms=config.LOOP_LAG_CHECK_INTERVAL_MS
+)
+sampling_profiler = SamplingProfiler(max_seconds=config.PROFILE_MAX_SECONDS)
@@ -0,0 +1,175 @@
+"""
+SQL Instrumentation Module
+Times every statement through SQLAlchemy cursor events, keeps per-fingerprint
+aggregates and logs slow queries (parameters redacted) in place of echo=True.
+"""
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import config
+from app.logger import logger
+
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_BIND_PARAM = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<!:):\w+|\?")
+# asyncpg renders binds with a cast, e.g. $1::VARCHAR or $2::VARCHAR(100),
+# which by this point read ?::VARCHAR and ?::VARCHAR(?)
+_PLACEHOLDER = r"\?(?:::[\w ]+(?:\(\?(?:\s*,\s*\?)*\))?(?:\[\])?)?"
+_PLACEHOLDER_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+_VALUES_LIST = re.compile(r"(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+")
+
+
+def fingerprint(statement: str) -> str:
+    """Normalize a statement so that calls differing only in literals/params share one key"""
+    text = _STRING_LITERAL.sub("?", statement)
+    text = _BIND_PARAM.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    # IN (?, ?, ?) and multi-row VALUES collapse regardless of length
+    text = _PLACEHOLDER_LIST.sub("(...)", text)
+    text = _VALUES_LIST.sub(r"\1", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """Replace parameter values with their type names so logs never carry user data"""
+    if isinstance(parameters, dict):
+        return {key: redact_parameters(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact_parameters(value) for value in parameters]
+    if parameters is None:
+        return None
+    return f"<{type(parameters).__name__}>"
+
+
+class QueryStats:
+    """Thread-safe per-fingerprint statement timings"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, key: str, duration_ms: float, slow: bool):
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is None:
+                entry = self._stats[key] = {
+                    "fingerprint": key,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "slow_count": 0,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+            if slow:
+                entry["slow_count"] += 1
+
+    def snapshot(self, limit: int = 50, order_by: str = "total_ms") -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = [dict(entry) for entry in self._stats.values()]
+        for entry in entries:
+            entry["mean_ms"] = entry["total_ms"] / entry["count"]
+            entry["total_ms"] = round(entry["total_ms"], 3)
+            entry["max_ms"] = round(entry["max_ms"], 3)
+            entry["mean_ms"] = round(entry["mean_ms"], 3)
+        entries.sort(key=lambda entry: entry[order_by], reverse=True)
+        return entries[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+# Global query stats instance
+query_stats = QueryStats()
+
+
+def _explain(conn, statement: str, parameters) -> List[str]:
+    """
+    Re-run a slow SELECT under EXPLAIN (ANALYZE, BUFFERS) on the same connection.
+    Uses a raw DBAPI cursor so the capture isn't itself instrumented, and a
+    savepoint so a failed EXPLAIN can't abort the caller's transaction.
+    """
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT query_stats_explain")
+        try:
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+            plan = [row[0] for row in cursor.fetchall()]
+            cursor.execute("RELEASE SAVEPOINT query_stats_explain")
+        except Exception:
+            cursor.execute("ROLLBACK TO SAVEPOINT query_stats_explain")
+            raise
+    finally:
+        cursor.close()
+    return plan
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    duration_ms = (time.perf_counter() - start_times.pop()) * 1000
+    key = fingerprint(statement)
+    slow = duration_ms >= config.SLOW_QUERY_THRESHOLD_MS
+    query_stats.record(key, duration_ms, slow)
+
+    if config.SQL_LOG_SAMPLE_RATE and random.random() < config.SQL_LOG_SAMPLE_RATE:
+        logger.debug(f"[query_stats] Sampled query", extra={
+            "fingerprint": key,
+            "duration_ms": round(duration_ms, 2)
+        })
+
+    if not slow:
+        return
+
+    details = {
+        "fingerprint": key,
+        "parameters": redact_parameters(parameters),
+        "executemany": executemany,
+        "duration_ms": round(duration_ms, 2),
+        "threshold_ms": config.SLOW_QUERY_THRESHOLD_MS
+    }
+    # EXPLAIN ANALYZE executes the statement again, so only ever do it for reads
+    # that weren't streamed through a server-side cursor that is still open
+    if (
+        config.SLOW_QUERY_EXPLAIN
+        and not executemany
+        and statement.lstrip().upper().startswith("SELECT")
+        and not context.execution_options.get("stream_results")
+    ):
+        try:
+            details["plan"] = _explain(conn, statement, parameters)
+        except Exception as e:
+            details["plan_error"] = str(e)
+    logger.warning(f"[query_stats] Slow query ({duration_ms:.1f} ms): {key}", extra=details)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute never fires for a failed statement; drop its start time
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def instrument_engine(engine) -> None:
+    """Attach the timing hooks to an Engine or AsyncEngine (idempotent)"""
+    sync_engine: Engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
@@ -0,0 +1,211 @@
+"""
+Write-behind group commit for user creation
+Queues POST /users/ inserts and commits them in small batches so that a burst
+of signups shares one transaction (and one commit fsync) instead of one each.
+"""
+import asyncio
+import time
+import uuid
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.config import config
+from app.database import AsyncSessionLocal
+from app.logger import logger
+from app.models import User, UserCreateModel
+from app.operations import build_user
+
+
+class UserConflictError(Exception):
+    """Raised to a caller whose username already exists or is taken earlier in its batch"""
+
+    def __init__(self, username: str):
+        super().__init__(f"Username already exists: {username}")
+        self.username = username
+
+
+def _resolve(future: asyncio.Future, result=None, exc: Optional[BaseException] = None):
+    """Settle a caller's future unless the caller already gave up (cancelled)"""
+    if future.done():
+        return
+    if exc is not None:
+        future.set_exception(exc)
+    else:
+        future.set_result(result)
+
+
+class UserCreateBatcher:
+    """Groups user inserts arriving within a short linger window into one transaction"""
+
+    def __init__(self, max_batch_size: int = 100, linger_ms: float = 5.0, session_factory=AsyncSessionLocal):
+        """
+        Initialize user create batcher
+
+        Args:
+            max_batch_size: Maximum number of inserts committed in one transaction
+            linger_ms: How long to wait for more inserts after the first one arrives
+            session_factory: Factory for the sessions the batches are written with
+        """
+        self.max_batch_size = max(1, max_batch_size)
+        self.linger = max(0.0, linger_ms) / 1000
+        self.session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._submitting = 0
+        self._submits_done: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._closing
+
+    def start(self):
+        """Start the background flush loop on the running event loop"""
+        if self._task is not None:
+            return
+        self._closing = False
+        self._queue = asyncio.Queue()
+        self._submits_done = asyncio.Event()
+        self._submits_done.set()
+        self._task = asyncio.create_task(self._run())
+        logger.info("[user_batcher] Started", extra={
+            "max_batch_size": self.max_batch_size,
+            "linger_ms": self.linger * 1000
+        })
+
+    async def stop(self):
+        """Stop accepting inserts and flush everything already queued"""
+        if self._task is None:
+            return
+        self._closing = True
+        # Let submits that are still hashing enqueue before the sentinel goes in
+        await self._submits_done.wait()
+        # The sentinel sits behind every queued insert, so they all get flushed first
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        self._queue = None
+        logger.info("[user_batcher] Stopped and flushed")
+
+    async def submit(self, user_data: UserCreateModel) -> User:
+        """
+        Queue a user for creation and wait for its batch to commit
+
+        Raises:
+            UserConflictError: If the username is taken
+            RuntimeError: If the batcher is not running
+        """
+        if not self.running:
+            raise RuntimeError("User batcher is not running")
+        self._submitting += 1
+        self._submits_done.clear()
+        try:
+            # bcrypt is the expensive part; hash in a worker thread before queueing
+            new_user = await asyncio.to_thread(build_user, user_data)
+            future = asyncio.get_running_loop().create_future()
+            self._queue.put_nowait((new_user, future))
+        finally:
+            self._submitting -= 1
+            if self._submitting == 0:
+                self._submits_done.set()
+        return await future
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            stopping = await self._collect(batch)
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                logger.exception(f"[user_batcher] Batch flush failed: {e}", extra={
+                    "batch_size": len(batch),
+                    "error_type": "batch_error",
+                    "error_details": str(e)
+                })
+                for _, future in batch:
+                    _resolve(future, exc=e)
+
+    async def _collect(self, batch: list) -> bool:
+        """Fill the batch until it is full or the linger window closes; True if the stop sentinel was seen"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.linger
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            try:
+                if timeout > 0:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                else:
+                    item = self._queue.get_nowait()
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+            if item is None:
+                return True
+            batch.append(item)
+        return False
+
+    async def _flush(self, batch: list):
+        batch_id = str(uuid.uuid4())[:8]
+        start_time = time.time()
+
+        # Callers that gave up (e.g. client disconnected) are dropped from the batch
+        pending = [(user, future) for user, future in batch if not future.done()]
+        if not pending:
+            return
+
+        # Within a batch the first request for a username wins
+        seen = set()
+        unique = []
+        for user, future in pending:
+            if user.username in seen:
+                _resolve(future, exc=UserConflictError(user.username))
+            else:
+                seen.add(user.username)
+                unique.append((user, future))
+
+        conflicts = len(pending) - len(unique)
+        # users.username has no unique constraint, so uniqueness (against other
+        # workers and the non-batched path too) rests on this pre-check. Any
+        # IntegrityError from the insert propagates and fails the whole batch.
+        async with self.session_factory(expire_on_commit=False) as session:
+            async with session.begin():
+                result = await session.execute(
+                    select(User.username).where(User.username.in_(list(seen)))
+                )
+                existing = set(result.scalars().all())
+
+                created = []
+                for user, future in unique:
+                    if user.username in existing:
+                        _resolve(future, exc=UserConflictError(user.username))
+                        conflicts += 1
+                    else:
+                        created.append((user, future))
+
+                session.add_all([user for user, _ in created])
+                await session.flush()
+
+        for user, future in created:
+            _resolve(future, result=user)
+
+        duration = time.time() - start_time
+        logger.info(f"[user_batcher] Flushed batch of {len(pending)} users", extra={
+            "batch_id": batch_id,
+            "operation": "create_user_batch",
+            "batch_size": len(pending),
+            "created_count": len(created),
+            "conflicts": conflicts,
+            "duration_ms": round(duration * 1000, 2),
+            "status": "success"
+        })
+
+
+# Global user batcher instance
+user_batcher = UserCreateBatcher(
+    max_batch_size=config.USER_BATCH_MAX_SIZE,
+    linger_ms=config.USER_BATCH_LINGER_MS
+)
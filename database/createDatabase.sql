@@ -17,6 +17,8 @@
 -- create index on user_id
     CREATE INDEX idx_users_email ON users (email);
     CREATE INDEX idx_users_user_id ON users (user_id);
+    CREATE INDEX idx_users_created_at ON users (created_at);
+    CREATE INDEX idx_users_username ON users (username);
 
 
 
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+User export script for ContosoBankAPI
+Streams the users table (without password hashes) to a CSV or Parquet file.
+With --state-file, each run only exports rows past the watermark recorded by
+the previous run, which makes it suitable for nightly incremental extracts.
+"""
+import argparse
+import asyncio
+import sys
+import os
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+# Add parent directory to path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import get_engine
+from app.export import EXPORT_FORMATS, UserExport, parquet_available
+from app.logger import logger
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export users as CSV or Parquet")
+    parser.add_argument("output", help="Output file path, or - for stdout")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--watermark", choices=["created_at", "updated_at"], default="created_at",
+                        help="Column used for incremental exports")
+    parser.add_argument("--since", type=datetime.fromisoformat,
+                        help="Only export rows after this ISO timestamp")
+    parser.add_argument("--state-file",
+                        help="File holding the last exported watermark; read before and updated after the run")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    return parser.parse_args()
+
+
+def read_watermark(path: str):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        value = f.read().strip()
+    return datetime.fromisoformat(value) if value else None
+
+
+def write_watermark(path: str, value: datetime):
+    # Write then rename so an interrupted run never leaves a truncated state file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(value.isoformat())
+    os.replace(tmp_path, path)
+
+
+async def main():
+    """Main function to run the export"""
+    args = parse_args()
+
+    if args.format == "parquet" and not parquet_available():
+        print("Parquet export requires pyarrow (pip install pyarrow)", file=sys.stderr)
+        sys.exit(1)
+    if args.output == "-" and args.format == "parquet":
+        print("Parquet export needs an output file", file=sys.stderr)
+        sys.exit(1)
+
+    since = args.since or read_watermark(args.state_file)
+    engine = get_engine()
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    export = UserExport(
+        since=since,
+        watermark=args.watermark,
+        chunk_size=args.chunk_size,
+        session_factory=session_factory
+    )
+
+    try:
+        out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+        try:
+            async for chunk in export.iter_format(args.format):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+    finally:
+        await engine.dispose()
+
+    if args.state_file and export.high_watermark is not None:
+        write_watermark(args.state_file, export.high_watermark)
+
+    logger.info(f"Exported {export.rows} users to {args.output}")
+    print(f"Exported {export.rows} users (high watermark: {export.high_watermark})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,14 +2,13 @@ import asyncio
 import sys
 import os
 from faker import Faker
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy import Column, Integer, String
 
 # Add parent directory to path to import app modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.config import config
 from app.models import UserCreateModel
 from app.database import get_engine,get_db_session
 from app.operations import (
@@ -17,9 +16,7 @@ from app.operations import (
 
 )
 # Create an asynchronous engine
-settings = config
-DATABASE_URL = settings.DATABASE_URL
-engine = create_async_engine(DATABASE_URL, echo=True)
+engine = get_engine()
 fake=Faker()
 
 # Create an asynchronous session factory
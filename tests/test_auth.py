@@ -0,0 +1,191 @@
+import asyncio
+import time
+
+import bcrypt
+import pytest
+
+from app import auth
+from app.auth import AuthBusyError, AuthThrottledError, FailedAttemptThrottle
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(auth.time, "monotonic", fake)
+    return fake
+
+
+def test_throttle_blocks_at_limit_until_window_passes(clock):
+    throttle = FailedAttemptThrottle(window_seconds=60)
+    for _ in range(3):
+        assert throttle.retry_after("user:alice", limit=3) == 0
+        throttle.record_attempt("user:alice")
+        clock.now += 10
+
+    # Oldest of the three attempts was 30s ago, so it expires in 30s
+    assert throttle.retry_after("user:alice", limit=3) == pytest.approx(30)
+    assert throttle.retry_after("user:bob", limit=3) == 0
+
+    clock.now += 30
+    assert throttle.retry_after("user:alice", limit=3) == 0
+
+
+def test_throttle_discard_and_reset(clock):
+    throttle = FailedAttemptThrottle(window_seconds=60)
+    first = throttle.record_attempt("ip:10.0.0.1")
+    clock.now += 1
+    throttle.record_attempt("ip:10.0.0.1")
+    assert throttle.retry_after("ip:10.0.0.1", limit=2) > 0
+
+    throttle.discard_attempt("ip:10.0.0.1", first)
+    assert throttle.retry_after("ip:10.0.0.1", limit=2) == 0
+    # Discarding an unknown stamp or key is a no-op
+    throttle.discard_attempt("ip:10.0.0.1", first)
+    throttle.discard_attempt("ip:10.0.0.2", first)
+
+    throttle.reset("ip:10.0.0.1")
+    assert throttle.retry_after("ip:10.0.0.1", limit=1) == 0
+
+
+def test_throttle_evicts_least_recently_attempted_key(clock):
+    throttle = FailedAttemptThrottle(window_seconds=60, max_keys=3)
+    for key in ("ip:a", "ip:b", "ip:c"):
+        throttle.record_attempt(key)
+    # A new attempt refreshes ip:a, so ip:b is the oldest
+    throttle.record_attempt("ip:a")
+    for i in range(10):
+        throttle.record_attempt(f"ip:new-{i}")
+        assert len(throttle._attempts) <= 3
+
+    assert list(throttle._attempts) == ["ip:new-7", "ip:new-8", "ip:new-9"]
+    assert throttle.retry_after("ip:a", limit=1) == 0
+
+
+class FakeResult:
+    def __init__(self, row):
+        self.row = row
+
+    def first(self):
+        return self.row
+
+
+class FakeSession:
+    """Stands in for AsyncSession: async context manager returning one user row"""
+
+    def __init__(self, row, fail_select=None, fail_update=None):
+        self.row = row
+        self.fail_select = fail_select
+        self.fail_update = fail_update
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def begin(self):
+        return self
+
+    async def execute(self, query):
+        failure = self.fail_select if query.is_select else self.fail_update
+        if failure is not None:
+            raise failure
+        return FakeResult(self.row)
+
+
+@pytest.fixture
+def fresh_auth_state(monkeypatch):
+    monkeypatch.setattr(auth, "failed_attempts", FailedAttemptThrottle(window_seconds=60))
+    monkeypatch.setattr(auth, "_bcrypt_pending", 0)
+    monkeypatch.setattr(auth.config, "BCRYPT_ROUNDS", 4)
+    monkeypatch.setattr(auth.config, "AUTH_MAX_FAILED_ATTEMPTS_PER_USERNAME", 3)
+    monkeypatch.setattr(auth.config, "AUTH_MAX_FAILED_ATTEMPTS_PER_IP", 100)
+
+
+def test_parallel_wrong_passwords_are_throttled_before_hashing(fresh_auth_state, monkeypatch):
+    stored = bcrypt.hashpw(b"correct", bcrypt.gensalt(rounds=4)).decode()
+    session = FakeSession(("user-id", stored))
+    checks = []
+    real_checkpw = auth._checkpw
+
+    def counting_checkpw(password, hashed):
+        checks.append(password)
+        return real_checkpw(password, hashed)
+
+    monkeypatch.setattr(auth, "_checkpw", counting_checkpw)
+
+    async def attempt():
+        try:
+            return await auth.verify_credentials(session, "alice", "wrong", "10.0.0.1")
+        except AuthThrottledError:
+            return "throttled"
+
+    async def burst():
+        return await asyncio.gather(*(attempt() for _ in range(10)))
+
+    results = asyncio.run(burst())
+    assert results.count(None) == 3
+    assert results.count("throttled") == 7
+    assert len(checks) == 3
+
+
+def test_successful_login_clears_its_pending_attempts(fresh_auth_state):
+    stored = bcrypt.hashpw(b"correct", bcrypt.gensalt(rounds=4)).decode()
+    session = FakeSession(("user-id", stored))
+
+    async def login():
+        return await auth.verify_credentials(session, "alice", "correct", "10.0.0.1")
+
+    for _ in range(5):
+        assert asyncio.run(login()) == "user-id"
+    assert auth.failed_attempts.retry_after("ip:10.0.0.1", limit=1) == 0
+
+
+def test_failed_lookup_is_not_counted_against_the_caller(fresh_auth_state):
+    session = FakeSession(None, fail_select=ConnectionError("database down"))
+
+    async def login():
+        return await auth.verify_credentials(session, "alice", "wrong", "10.0.0.1")
+
+    for _ in range(5):
+        with pytest.raises(ConnectionError):
+            asyncio.run(login())
+    assert auth.failed_attempts.retry_after("user:alice", limit=1) == 0
+    assert auth.failed_attempts.retry_after("ip:10.0.0.1", limit=1) == 0
+
+
+def test_failed_rehash_still_logs_in(fresh_auth_state):
+    # Stored at cost 5 while BCRYPT_ROUNDS is 4, so a rehash is attempted
+    stored = bcrypt.hashpw(b"correct", bcrypt.gensalt(rounds=5)).decode()
+    session = FakeSession(("user-id", stored), fail_update=ConnectionError("database down"))
+
+    async def login():
+        return await auth.verify_credentials(session, "alice", "correct", "10.0.0.1")
+
+    assert asyncio.run(login()) == "user-id"
+
+
+def test_run_bcrypt_rejects_when_queue_is_full(fresh_auth_state, monkeypatch):
+    monkeypatch.setattr(auth.config, "BCRYPT_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(auth.config, "BCRYPT_MAX_QUEUE", 1)
+
+    async def run():
+        # Sized to match the patched concurrency, and created on this test's loop
+        monkeypatch.setattr(auth, "_bcrypt_slots", asyncio.Semaphore(1))
+        slow = [asyncio.create_task(auth._run_bcrypt(time.sleep, 0.1)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(AuthBusyError):
+            await auth._run_bcrypt(time.sleep, 0)
+        await asyncio.gather(*slow)
+        # Capacity comes back once the queue drains
+        await auth._run_bcrypt(time.sleep, 0)
+
+    asyncio.run(run())
@@ -0,0 +1,71 @@
+from app.query_stats import QueryStats, fingerprint, redact_parameters
+
+
+def _in_list(n):
+    return ", ".join(f"${i}::VARCHAR" for i in range(1, n + 1))
+
+
+def test_fingerprint_collapses_asyncpg_in_lists():
+    two = fingerprint(f"SELECT users.username FROM users WHERE users.username IN ({_in_list(2)})")
+    three = fingerprint(f"SELECT users.username FROM users WHERE users.username IN ({_in_list(3)})")
+    assert two == three
+    assert two == "SELECT users.username FROM users WHERE users.username IN (...)"
+
+
+def test_fingerprint_collapses_multi_row_values():
+    def insert(n):
+        rows = ", ".join(
+            f"(${2 * i + 1}::UUID, ${2 * i + 2}::VARCHAR(100), {i})" for i in range(n)
+        )
+        return (
+            "INSERT INTO users (user_id, username) SELECT p0::UUID, p1::VARCHAR "
+            f"FROM (VALUES {rows}) AS imp_sen(p0, p1, sen_counter) ORDER BY sen_counter"
+        )
+
+    assert fingerprint(insert(1)) == fingerprint(insert(5))
+    assert "VALUES (...))" in fingerprint(insert(5))
+
+
+def test_fingerprint_strips_literals_and_keeps_casts():
+    statement = """
+        SELECT users.user_id FROM users
+        WHERE users.username = $1::VARCHAR AND users.email = 'a@b.com' LIMIT 10
+    """
+    assert fingerprint(statement) == (
+        "SELECT users.user_id FROM users WHERE users.username = ?::VARCHAR "
+        "AND users.email = ? LIMIT ?"
+    )
+
+
+def test_fingerprint_ignores_double_colon_casts_on_columns():
+    assert fingerprint("SELECT c.reltuples::bigint FROM pg_class c") == (
+        "SELECT c.reltuples::bigint FROM pg_class c"
+    )
+
+
+def test_redact_parameters_keeps_shape_not_values():
+    assert redact_parameters(("alice", 42, None)) == ["<str>", "<int>", None]
+    assert redact_parameters({"username": "alice", "ids": [1, 2]}) == {
+        "username": "<str>",
+        "ids": ["<int>", "<int>"],
+    }
+
+
+def test_query_stats_aggregates_per_fingerprint():
+    stats = QueryStats()
+    stats.record("SELECT ?", 10.0, slow=False)
+    stats.record("SELECT ?", 30.0, slow=True)
+    stats.record("UPDATE t SET a = ?", 5.0, slow=False)
+
+    top = stats.snapshot(limit=1)
+    assert top == [{
+        "fingerprint": "SELECT ?",
+        "count": 2,
+        "total_ms": 40.0,
+        "max_ms": 30.0,
+        "slow_count": 1,
+        "mean_ms": 20.0,
+    }]
+
+    stats.reset()
+    assert stats.snapshot() == []
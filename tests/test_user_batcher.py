@@ -0,0 +1,179 @@
+import asyncio
+import time
+
+import pytest
+
+from app import user_batcher as batcher_module
+from app.models import UserCreateModel
+from app.user_batcher import UserConflictError, UserCreateBatcher
+
+
+class FakeResult:
+    def __init__(self, values):
+        self.values = values
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.values
+
+
+class FakeTransaction:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeDatabase:
+    """session_factory stand-in: records committed batches, can hold existing usernames or fail"""
+
+    def __init__(self, existing=(), fail_with=None, query_delay=0.0):
+        self.existing = set(existing)
+        self.fail_with = fail_with
+        self.query_delay = query_delay
+        self.batches = []
+
+    def __call__(self, **kwargs):
+        return FakeSession(self)
+
+
+class FakeSession:
+    def __init__(self, database):
+        self.database = database
+        self.added = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def begin(self):
+        return FakeTransaction()
+
+    async def execute(self, query):
+        await asyncio.sleep(self.database.query_delay)
+        return FakeResult(sorted(self.database.existing))
+
+    def add_all(self, users):
+        self.added.extend(users)
+
+    async def flush(self):
+        if self.database.fail_with is not None:
+            raise self.database.fail_with
+        self.database.batches.append([user.username for user in self.added])
+
+
+def make_user(username):
+    return UserCreateModel(
+        first_name="Ada",
+        last_name="Lovelace",
+        email=f"{username}@example.com",
+        username=username,
+        password_hash="secret",
+    )
+
+
+@pytest.fixture(autouse=True)
+def cheap_hashing(monkeypatch):
+    monkeypatch.setattr(batcher_module.config, "BCRYPT_ROUNDS", 4)
+
+
+def test_duplicates_within_batch_and_existing_usernames_conflict():
+    database = FakeDatabase(existing={"taken"})
+
+    async def run():
+        batcher = UserCreateBatcher(max_batch_size=10, linger_ms=20, session_factory=database)
+        batcher.start()
+        results = await asyncio.gather(
+            batcher.submit(make_user("alice")),
+            batcher.submit(make_user("alice")),
+            batcher.submit(make_user("taken")),
+            batcher.submit(make_user("bob")),
+            return_exceptions=True,
+        )
+        await batcher.stop()
+        return results
+
+    first, second, taken, bob = asyncio.run(run())
+    # Hashing order decides which alice is queued first; exactly one wins
+    alices = sorted([first, second], key=lambda result: isinstance(result, UserConflictError))
+    assert alices[0].username == "alice"
+    assert isinstance(alices[1], UserConflictError)
+    assert isinstance(taken, UserConflictError)
+    assert bob.username == "bob"
+    assert database.batches == [["alice", "bob"]]
+
+
+def test_cancelled_caller_is_dropped_from_batch():
+    database = FakeDatabase()
+
+    async def run():
+        batcher = UserCreateBatcher(max_batch_size=10, linger_ms=200, session_factory=database)
+        batcher.start()
+        keep = asyncio.create_task(batcher.submit(make_user("keep")))
+        gone = asyncio.create_task(batcher.submit(make_user("gone")))
+        # Cancel once both are hashed and queued, while the batch is still lingering
+        await asyncio.sleep(0.03)
+        assert not database.batches
+        gone.cancel()
+        user = await keep
+        await batcher.stop()
+        return user, gone
+
+    user, gone = asyncio.run(run())
+    assert user.username == "keep"
+    assert gone.cancelled()
+    assert database.batches == [["keep"]]
+
+
+def test_stop_flushes_queued_and_in_flight_submits(monkeypatch):
+    database = FakeDatabase()
+    real_build_user = batcher_module.build_user
+
+    def slow_build_user(user_data):
+        time.sleep(0.2)
+        return real_build_user(user_data)
+
+    monkeypatch.setattr(batcher_module, "build_user", slow_build_user)
+
+    async def run():
+        batcher = UserCreateBatcher(max_batch_size=10, linger_ms=1, session_factory=database)
+        batcher.start()
+        submits = [asyncio.create_task(batcher.submit(make_user(name))) for name in ("a", "b")]
+        # Both submits are still hashing when shutdown starts
+        await asyncio.sleep(0.05)
+        await batcher.stop()
+        assert all(task.done() for task in submits)
+        with pytest.raises(RuntimeError):
+            await batcher.submit(make_user("late"))
+        return [task.result().username for task in submits]
+
+    assert sorted(asyncio.run(run())) == ["a", "b"]
+    assert sorted(name for batch in database.batches for name in batch) == ["a", "b"]
+
+
+def test_flush_error_fails_only_still_pending_callers():
+    error = RuntimeError("connection lost")
+    database = FakeDatabase(existing={"taken"}, fail_with=error)
+
+    async def run():
+        batcher = UserCreateBatcher(max_batch_size=10, linger_ms=20, session_factory=database)
+        batcher.start()
+        results = await asyncio.gather(
+            batcher.submit(make_user("taken")),
+            batcher.submit(make_user("alice")),
+            batcher.submit(make_user("bob")),
+            return_exceptions=True,
+        )
+        await batcher.stop()
+        return results
+
+    taken, alice, bob = asyncio.run(run())
+    # Already settled as a conflict before the insert failed
+    assert isinstance(taken, UserConflictError)
+    assert alice is error
+    assert bob is error